@@ -1,5 +1,14 @@
+import orjson
+import threading
+import time
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+from sqlalchemy import bindparam, event, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased
 from src.extensions import db
 from payments.payment import Payment
 from returns.product_return import ProductReturn, DamagedProduct
@@ -7,249 +16,412 @@ from stock_transactions.stock_transaction import StockTransaction
 from customers.customer import Customer
 from suppliers.supplier import Supplier
 from products.product import Product
+from damage.supplier_return import SupplierReturn
+
+ExchangeProduct = aliased(Product)
+
+# Status filters as expanding bind parameters, so the rendered SQL stays the same across calls
+_PAYMENT_STATUSES = bindparam('payment_statuses', value=['Successful', 'Partially Paid'], expanding=True)
+_REFUND_RETURN_STATUSES = bindparam('refund_return_statuses', value=['Pending', 'Processed', 'Completed'], expanding=True)
+
+# Composite cash flow results, shared across requests for a short time
+_cashflow_cache = TTLCache(maxsize=16, ttl=30)
+_cashflow_cache_lock = threading.Lock()
+
+# JSON-encoded summary kept up to date by the background refresher
+_summary_cache = None
+# Bumped on every clear, so a computation that raced a write can tell its result is stale
+_cache_generation = 0
+
+def clear_cashflow_cache():
+    global _summary_cache, _cache_generation
+    with _cashflow_cache_lock:
+        _cashflow_cache.clear()
+        _summary_cache = None
+        _cache_generation += 1
+
+def _cashflow_cached(key):
+    """Cache results in _cashflow_cache, skipping any computed across a cache clear
+    
+    Like cachetools.cached the function runs outside the lock, so a commit can land
+    while it is still reading the old rows; such a result is returned but not stored.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            with _cashflow_cache_lock:
+                try:
+                    return _cashflow_cache[k]
+                except KeyError:
+                    generation = _cache_generation
+            value = func(*args, **kwargs)
+            with _cashflow_cache_lock:
+                if generation == _cache_generation:
+                    value = _cashflow_cache.setdefault(k, value)
+            return value
+        return wrapper
+    return decorator
+
+# Any committed write to a cash flow source table makes the cached results stale
+_CASHFLOW_MODELS = (Payment, ProductReturn, StockTransaction, SupplierReturn)
+_CASHFLOW_DIRTY_KEY = "cashflow_dirty"
+
+@event.listens_for(Session, "after_flush")
+def _track_cashflow_flush(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, _CASHFLOW_MODELS):
+            session.info[_CASHFLOW_DIRTY_KEY] = True
+            return
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_cashflow_bulk_write(orm_execute_state):
+    # Bulk Query.update()/delete() bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if any(mapper.class_ in _CASHFLOW_MODELS for mapper in orm_execute_state.all_mappers):
+            orm_execute_state.session.info[_CASHFLOW_DIRTY_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cashflow_cache(session):
+    # Cleared only once the rows are committed; the generation bump stops requests
+    # that were already reading the old rows from caching their results
+    if session.info.pop(_CASHFLOW_DIRTY_KEY, False):
+        clear_cashflow_cache()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_cashflow_writes(session):
+    session.info.pop(_CASHFLOW_DIRTY_KEY, None)
+
+def _filter_dates(query, column, date_from=None, date_to=None):
+    """Restrict a query to rows whose date column falls in the given range
+    
+    A plain date covers the whole day, so date_to includes every timestamp on it.
+    """
+    if date_from:
+        if not isinstance(date_from, datetime):
+            date_from = datetime.combine(date_from, datetime.min.time())
+        query = query.filter(column >= date_from)
+    if date_to:
+        if isinstance(date_to, datetime):
+            query = query.filter(column <= date_to)
+        else:
+            query = query.filter(column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
+
+def _pagination_info(page, per_page, total):
+    pages = (total + per_page - 1) // per_page
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": pages,
+        "has_next": page < pages,
+        "has_prev": page > 1
+    }
+
+@lru_cache(maxsize=2048)
+def _isoformat(value):
+    # Transactions from the same day often share timestamps
+    return value.isoformat()
 
 class CashFlowService:
     
     @staticmethod
-    def get_customer_payments():
-        """Get all payments received from customers (includes adjustment payments where customer pays us extra)"""
-        try:
-            # Get all successful payments from customers
-            payments = db.session.query(
-                Payment, Customer
-            ).join(Customer, Payment.customer_id == Customer.id).filter(
-                Payment.payment_status.in_(['Successful', 'Partially Paid']),
-                Payment.amount_paid > 0
-            ).order_by(Payment.payment_date.desc()).all()
-            
-            # Get adjustment payments where customer pays us extra
-            adjustments = db.session.query(
-                ProductReturn, Customer, Product
-            ).join(Customer, ProductReturn.customer_id == Customer.id
-            ).join(Product, ProductReturn.product_id == Product.id).filter(
-                ProductReturn.return_type == 'exchange',
-                ProductReturn.exchange_price_difference > 0,
-                ProductReturn.refund_amount == 0
-            ).order_by(ProductReturn.return_date.desc()).all()
-            
-            customer_payments = []
-            total_received = Decimal('0')
-            
-            # Add regular payments
-            for payment, customer in payments:
-                amount = Decimal(payment.amount_paid or 0)
-                total_received += amount
-                
-                customer_payments.append({
-                    "payment_id": payment.id,
-                    "invoice_id": payment.invoice_id,
-                    "customer_id": customer.id,
-                    "customer_name": customer.contact_person,
-                    "business_name": customer.business_name,
-                    "amount_paid": CashFlowService.format_decimal(amount),
-                    "payment_method": payment.payment_method,
-                    "payment_date": payment.payment_date.isoformat(),
-                    "transaction_reference": payment.transaction_reference,
-                    "payment_type": "regular_payment",
-                    "status": payment.payment_status
-                })
-            
-            # Add adjustment payments
-            for adjustment, customer, product in adjustments:
-                amount = Decimal(adjustment.exchange_price_difference or 0)
-                total_received += amount
-                
-                customer_payments.append({
-                    "payment_id": f"ADJ-{adjustment.id}",
-                    "invoice_id": adjustment.original_invoice_id,
-                    "customer_id": customer.id,
-                    "customer_name": customer.contact_person,
-                    "business_name": customer.business_name,
-                    "amount_paid": CashFlowService.format_decimal(amount),
-                    "payment_method": "adjustment",
-                    "payment_date": adjustment.return_date.isoformat(),
-                    "transaction_reference": adjustment.return_number,
-                    "payment_type": "adjustment_payment",
-                    "status": "Completed",
-                    "adjustment_details": f"Customer pays extra for exchange: {product.product_name} -> {adjustment.exchange_product.product_name if adjustment.exchange_product else 'N/A'}"
-                })
-            
-            return {
-                "customer_payments": customer_payments,
-                "total_received": CashFlowService.format_decimal(total_received),
-                "count": len(customer_payments)
-            }
-        except Exception as e:
-            raise Exception(f"Error fetching customer payments: {str(e)}")
+    def get_customer_payments(page=None, per_page=None, date_from=None, date_to=None):
+        """Get all payments received from customers (includes adjustment payments where customer pays us extra)
+        
+        When per_page is given only that page of transactions is returned, while
+        the total and count still cover the whole date range.
+        """
+        # Get all successful payments from customers
+        payments_query = db.session.query(
+            Payment.id, Payment.invoice_id, Payment.amount_paid, Payment.payment_method,
+            Payment.payment_date, Payment.transaction_reference, Payment.payment_status,
+            Customer.id.label('customer_id'), Customer.contact_person, Customer.business_name
+        ).join(Customer, Payment.customer_id == Customer.id).filter(
+            Payment.payment_status.in_(_PAYMENT_STATUSES),
+            Payment.amount_paid > 0
+        ).order_by(Payment.payment_date.desc())
+        payments_query = _filter_dates(payments_query, Payment.payment_date, date_from, date_to)
+        
+        # Get adjustment payments where customer pays us extra
+        adjustments_query = db.session.query(
+            ProductReturn.id, ProductReturn.original_invoice_id, ProductReturn.exchange_price_difference,
+            ProductReturn.return_date, ProductReturn.return_number,
+            Customer.id.label('customer_id'), Customer.contact_person, Customer.business_name,
+            Product.product_name, ExchangeProduct.product_name.label('exchange_product_name')
+        ).join(Customer, ProductReturn.customer_id == Customer.id
+        ).join(Product, ProductReturn.product_id == Product.id
+        ).outerjoin(ExchangeProduct, ProductReturn.exchange_product_id == ExchangeProduct.id).filter(
+            ProductReturn.return_type == 'exchange',
+            ProductReturn.exchange_price_difference > 0,
+            ProductReturn.refund_amount == 0
+        ).order_by(ProductReturn.return_date.desc())
+        adjustments_query = _filter_dates(adjustments_query, ProductReturn.return_date, date_from, date_to)
+        
+        if per_page:
+            # Regular payments are listed first, adjustments continue after them
+            start = (page - 1) * per_page
+            payments = payments_query.offset(start).limit(per_page).all()
+            adjustments = []
+            remaining = per_page - len(payments)
+            if remaining:
+                payments_count = payments_query.order_by(None).count()
+                adjustments = adjustments_query.offset(max(start - payments_count, 0)).limit(remaining).all()
+        else:
+            payments = payments_query.all()
+            adjustments = adjustments_query.all()
+        
+        payment_amounts = [CashFlowService.to_cents(payment.amount_paid) for payment in payments]
+        adjustment_amounts = [
+            CashFlowService.to_cents(adjustment.exchange_price_difference) for adjustment in adjustments
+        ]
+        total_received = sum(payment_amounts) + sum(adjustment_amounts)
+        
+        customer_payments = []
+        
+        # Add regular payments
+        for payment, amount in zip(payments, payment_amounts):
+            customer_payments.append({
+                "payment_id": payment.id,
+                "invoice_id": payment.invoice_id,
+                "customer_id": payment.customer_id,
+                "customer_name": payment.contact_person,
+                "business_name": payment.business_name,
+                "amount_paid": CashFlowService.format_cents(amount),
+                "payment_method": payment.payment_method,
+                "payment_date": _isoformat(payment.payment_date),
+                "transaction_reference": payment.transaction_reference,
+                "payment_type": "regular_payment",
+                "status": payment.payment_status
+            })
+        
+        # Add adjustment payments
+        for adjustment, amount in zip(adjustments, adjustment_amounts):
+            customer_payments.append({
+                "payment_id": f"ADJ-{adjustment.id}",
+                "invoice_id": adjustment.original_invoice_id,
+                "customer_id": adjustment.customer_id,
+                "customer_name": adjustment.contact_person,
+                "business_name": adjustment.business_name,
+                "amount_paid": CashFlowService.format_cents(amount),
+                "payment_method": "adjustment",
+                "payment_date": _isoformat(adjustment.return_date),
+                "transaction_reference": adjustment.return_number,
+                "payment_type": "adjustment_payment",
+                "status": "Completed",
+                "adjustment_details": f"Customer pays extra for exchange: {adjustment.product_name} -> {adjustment.exchange_product_name or 'N/A'}"
+            })
+        
+        count = len(customer_payments)
+        if per_page:
+            total_received, count = CashFlowService._sum_customer_payments(date_from, date_to)
+        
+        result = {
+            "customer_payments": customer_payments,
+            "total_received": CashFlowService.format_cents(total_received),
+            "count": count
+        }
+        if per_page:
+            result["pagination"] = _pagination_info(page, per_page, count)
+        return result
     
     @staticmethod
-    def get_customer_refunds():
+    def get_customer_refunds(page=None, per_page=None, date_from=None, date_to=None):
         """Get all refunds paid to customers (returns, damaged products, and adjustments)"""
-        try:
-            # Get all returns with refund amounts (including all statuses except cancelled)
-            refunds = db.session.query(
-                ProductReturn, Customer, Product
-            ).join(Customer, ProductReturn.customer_id == Customer.id
-            ).join(Product, ProductReturn.product_id == Product.id).filter(
-                ProductReturn.refund_amount > 0,
-                ProductReturn.status.in_(['Pending', 'Processed', 'Completed'])
-            ).order_by(ProductReturn.return_date.desc()).all()
-            
-            customer_refunds = []
-            total_refunded = Decimal('0')
+        # Get all returns with refund amounts (including all statuses except cancelled)
+        refunds_query = db.session.query(
+            ProductReturn.id, ProductReturn.return_number, ProductReturn.refund_amount,
+            ProductReturn.return_type, ProductReturn.reason, ProductReturn.return_date,
+            ProductReturn.quantity_returned,
+            Customer.id.label('customer_id'), Customer.contact_person, Customer.business_name,
+            Product.product_name, ExchangeProduct.product_name.label('exchange_product_name')
+        ).join(Customer, ProductReturn.customer_id == Customer.id
+        ).join(Product, ProductReturn.product_id == Product.id
+        ).outerjoin(ExchangeProduct, ProductReturn.exchange_product_id == ExchangeProduct.id).filter(
+            ProductReturn.refund_amount > 0,
+            ProductReturn.status.in_(_REFUND_RETURN_STATUSES)
+        ).order_by(ProductReturn.return_date.desc())
+        refunds_query = _filter_dates(refunds_query, ProductReturn.return_date, date_from, date_to)
+        
+        if per_page:
+            refunds_query = refunds_query.offset((page - 1) * per_page).limit(per_page)
+        refunds = refunds_query.all()
+        
+        amounts = [CashFlowService.to_cents(refund.refund_amount) for refund in refunds]
+        total_refunded = sum(amounts)
+        
+        customer_refunds = []
+        for refund, amount in zip(refunds, amounts):
+            # Determine refund type and reason
+            refund_type = refund.return_type
+            reason = refund.reason
             
-            for refund, customer, product in refunds:
-                amount = Decimal(refund.refund_amount or 0)
-                total_refunded += amount
-                
-                # Determine refund type and reason
-                refund_type = refund.return_type
-                reason = refund.reason
-                
-                if refund.return_type == 'exchange':
-                    refund_type = 'adjustment_refund'
-                    reason = f"Adjustment - We pay customer extra amount for product exchange"
-                
-                customer_refunds.append({
-                    "return_id": refund.id,
-                    "return_number": refund.return_number,
-                    "customer_id": customer.id,
-                    "customer_name": customer.contact_person,
-                    "business_name": customer.business_name,
-                    "product_name": product.product_name,
-                    "refund_amount": CashFlowService.format_decimal(amount),
-                    "refund_type": refund_type,
-                    "reason": reason,
-                    "return_date": refund.return_date.isoformat(),
-                    "quantity_returned": refund.quantity_returned,
-                    "exchange_product": refund.exchange_product.product_name if refund.exchange_product else None
-                })
+            if refund.return_type == 'exchange':
+                refund_type = 'adjustment_refund'
+                reason = f"Adjustment - We pay customer extra amount for product exchange"
             
-            return {
-                "customer_refunds": customer_refunds,
-                "total_refunded": CashFlowService.format_decimal(total_refunded),
-                "count": len(customer_refunds)
-            }
-        except Exception as e:
-            raise Exception(f"Error fetching customer refunds: {str(e)}")
+            customer_refunds.append({
+                "return_id": refund.id,
+                "return_number": refund.return_number,
+                "customer_id": refund.customer_id,
+                "customer_name": refund.contact_person,
+                "business_name": refund.business_name,
+                "product_name": refund.product_name,
+                "refund_amount": CashFlowService.format_cents(amount),
+                "refund_type": refund_type,
+                "reason": reason,
+                "return_date": _isoformat(refund.return_date),
+                "quantity_returned": refund.quantity_returned,
+                "exchange_product": refund.exchange_product_name
+            })
+        
+        count = len(customer_refunds)
+        if per_page:
+            total_refunded, count = CashFlowService._sum_customer_refunds(date_from, date_to)
+        
+        result = {
+            "customer_refunds": customer_refunds,
+            "total_refunded": CashFlowService.format_cents(total_refunded),
+            "count": count
+        }
+        if per_page:
+            result["pagination"] = _pagination_info(page, per_page, count)
+        return result
     
     @staticmethod
-    def get_supplier_payments():
+    def get_supplier_payments(page=None, per_page=None, date_from=None, date_to=None):
         """Get all payments made to suppliers"""
-        try:
-            import json
-            # Get all purchase transactions
-            transactions = db.session.query(
-                StockTransaction, Supplier
-            ).join(Supplier, StockTransaction.supplier_id == Supplier.id).filter(
-                StockTransaction.transaction_type == 'Purchase'
-            ).order_by(StockTransaction.transaction_date.desc()).all()
+        # Get purchase transactions with an actual payment
+        transactions_query = db.session.query(
+            StockTransaction.id, StockTransaction.product_id, StockTransaction.quantity,
+            StockTransaction.transaction_date, StockTransaction.reference_number,
+            StockTransaction.payment_amount, StockTransaction.payment_method, StockTransaction.payment_status,
+            StockTransaction.tx_reference, StockTransaction.products,
+            Supplier.id.label('supplier_id'), Supplier.contact_person, Supplier.name
+        ).join(Supplier, StockTransaction.supplier_id == Supplier.id).filter(
+            StockTransaction.transaction_type == 'Purchase',
+            StockTransaction.payment_amount > 0
+        ).order_by(StockTransaction.transaction_date.desc())
+        transactions_query = _filter_dates(
+            transactions_query, StockTransaction.transaction_date, date_from, date_to
+        )
+        
+        if per_page:
+            transactions = transactions_query.offset((page - 1) * per_page).limit(per_page).all()
+        else:
+            # Streamed in batches rather than buffering the whole purchase history first
+            transactions = transactions_query.yield_per(500)
+        
+        total_paid = 0
+        supplier_payments = []
+        missing_products = []
+        for transaction in transactions:
+            payment_amount = CashFlowService.to_cents(transaction.payment_amount)
+            total_paid += payment_amount
             
-            supplier_payments = []
-            total_paid = Decimal('0')
+            # Get product names from stored info, single product names are filled in below
+            product_names = []
+            if transaction.products:
+                product_names = [p.get('name', '') for p in transaction.products]
+            elif transaction.product_id:
+                missing_products.append((product_names, transaction.product_id))
             
-            for transaction, supplier in transactions:
-                # Extract payment info from notes
-                payment_amount = Decimal('0')
-                payment_method = None
-                payment_status = None
-                transaction_reference = None
-                products_info = []
-                
-                if transaction.notes:
-                    try:
-                        payment_info = json.loads(transaction.notes)
-                        payment_amount = Decimal(payment_info.get('payment_amount', '0'))
-                        payment_method = payment_info.get('payment_method')
-                        payment_status = payment_info.get('payment_status')
-                        transaction_reference = payment_info.get('transaction_reference')
-                        products_info = payment_info.get('products', [])
-                    except (json.JSONDecodeError, ValueError):
-                        pass
-                
-                # Only include transactions with actual payments
-                if payment_amount > 0:
-                    total_paid += payment_amount
-                    
-                    # Get product names from stored info or fallback to single product
-                    product_names = []
-                    if products_info:
-                        product_names = [p.get('name', '') for p in products_info]
-                    else:
-                        product = Product.query.get(transaction.product_id)
-                        if product:
-                            product_names = [product.product_name]
-                    
-                    supplier_payments.append({
-                        "transaction_id": transaction.id,
-                        "supplier_id": supplier.id,
-                        "supplier_name": supplier.contact_person,
-                        "business_name": supplier.name,
-                        "products": product_names,
-                        "quantity": transaction.quantity,
-                        "amount_paid": str(payment_amount),
-                        "payment_method": payment_method,
-                        "payment_status": payment_status,
-                        "transaction_date": transaction.transaction_date.isoformat(),
-                        "reference_number": transaction.reference_number,
-                        "transaction_reference": transaction_reference
-                    })
-            
-            return {
-                "supplier_payments": supplier_payments,
-                "total_paid": str(total_paid),
-                "count": len(supplier_payments)
-            }
-        except Exception as e:
-            raise Exception(f"Error fetching supplier payments: {str(e)}")
+            supplier_payments.append({
+                "transaction_id": transaction.id,
+                "supplier_id": transaction.supplier_id,
+                "supplier_name": transaction.contact_person,
+                "business_name": transaction.name,
+                "products": product_names,
+                "quantity": transaction.quantity,
+                "amount_paid": CashFlowService.format_cents(payment_amount),
+                "payment_method": transaction.payment_method,
+                "payment_status": transaction.payment_status,
+                "transaction_date": _isoformat(transaction.transaction_date),
+                "reference_number": transaction.reference_number,
+                "transaction_reference": transaction.tx_reference
+            })
+        
+        # Fetch fallback products in one query instead of one per transaction
+        if missing_products:
+            fallback_ids = {product_id for _, product_id in missing_products}
+            product_names_by_id = dict(
+                db.session.query(Product.id, Product.product_name).filter(Product.id.in_(fallback_ids)).all()
+            )
+            for product_names, product_id in missing_products:
+                if product_id in product_names_by_id:
+                    product_names.append(product_names_by_id[product_id])
+        
+        count = len(supplier_payments)
+        if per_page:
+            total_paid, count = CashFlowService._sum_supplier_payments(date_from, date_to)
+        
+        result = {
+            "supplier_payments": supplier_payments,
+            "total_paid": CashFlowService.format_cents(total_paid),
+            "count": count
+        }
+        if per_page:
+            result["pagination"] = _pagination_info(page, per_page, count)
+        return result
     
     @staticmethod
-    def get_supplier_receipts():
+    def get_supplier_receipts(page=None, per_page=None, date_from=None, date_to=None):
         """Get all payments received from suppliers (supplier returns/refunds)"""
         try:
             # Get supplier damage returns where we received money
-            from damage.supplier_return import SupplierReturn
-            from returns.product_return import DamagedProduct
-            
-            receipts = db.session.query(
-                SupplierReturn, Supplier
-            ).join(Supplier, SupplierReturn.supplier_id == Supplier.id).filter(
+            receipts_query = db.session.query(
+                SupplierReturn.id, SupplierReturn.return_number, SupplierReturn.refund_amount,
+                SupplierReturn.return_type, SupplierReturn.return_date, SupplierReturn.quantity_returned,
+                SupplierReturn.status,
+                Supplier.id.label('supplier_id'), Supplier.contact_person, Supplier.name,
+                Product.product_name
+            ).join(Supplier, SupplierReturn.supplier_id == Supplier.id
+            ).outerjoin(DamagedProduct, SupplierReturn.damaged_product_id == DamagedProduct.id
+            ).outerjoin(Product, DamagedProduct.product_id == Product.id).filter(
                 SupplierReturn.refund_amount > 0,
                 SupplierReturn.status == 'Completed'
-            ).order_by(SupplierReturn.return_date.desc()).all()
+            ).order_by(SupplierReturn.return_date.desc())
+            receipts_query = _filter_dates(receipts_query, SupplierReturn.return_date, date_from, date_to)
             
-            supplier_receipts = []
-            total_received = Decimal('0')
+            if per_page:
+                receipts_query = receipts_query.offset((page - 1) * per_page).limit(per_page)
+            receipts = receipts_query.all()
+            
+            amounts = [CashFlowService.to_cents(receipt.refund_amount) for receipt in receipts]
+            total_received = sum(amounts)
             
-            for receipt, supplier in receipts:
-                amount = Decimal(receipt.refund_amount or 0)
-                total_received += amount
-                
-                # Get product info from damaged product
-                damaged_product = DamagedProduct.query.get(receipt.damaged_product_id)
-                product = Product.query.get(damaged_product.product_id) if damaged_product else None
-                
+            supplier_receipts = []
+            for receipt, amount in zip(receipts, amounts):
                 supplier_receipts.append({
                     "return_id": receipt.id,
                     "return_number": receipt.return_number,
-                    "supplier_id": supplier.id,
-                    "supplier_name": supplier.contact_person,
-                    "business_name": supplier.name,
-                    "product_name": product.product_name if product else 'Unknown Product',
-                    "refund_amount": str(amount),
+                    "supplier_id": receipt.supplier_id,
+                    "supplier_name": receipt.contact_person,
+                    "business_name": receipt.name,
+                    "product_name": receipt.product_name if receipt.product_name is not None else 'Unknown Product',
+                    "refund_amount": CashFlowService.format_cents(amount),
                     "return_type": receipt.return_type,
-                    "return_date": receipt.return_date.isoformat(),
+                    "return_date": _isoformat(receipt.return_date),
                     "quantity_returned": receipt.quantity_returned,
                     "status": receipt.status
                 })
             
-            return {
+            count = len(supplier_receipts)
+            if per_page:
+                total_received, count = CashFlowService._sum_supplier_receipts(date_from, date_to)
+            
+            result = {
                 "supplier_receipts": supplier_receipts,
-                "total_received": str(total_received),
-                "count": len(supplier_receipts)
+                "total_received": CashFlowService.format_cents(total_received),
+                "count": count
             }
-        except Exception as e:
+            if per_page:
+                result["pagination"] = _pagination_info(page, per_page, count)
+            return result
+        except SQLAlchemyError:
             # If supplier returns don't exist, return empty
+            db.session.rollback()
             return {
                 "supplier_receipts": [],
                 "total_received": "0.00",
@@ -257,72 +429,234 @@ class CashFlowService:
             }
     
     @staticmethod
-    def format_decimal(value):
-        """Format decimal to 2 decimal places"""
-        return f"{Decimal(str(value)):.2f}"
+    def _sum_customer_payments(date_from=None, date_to=None):
+        """Total and count of customer payments, aggregated in the database"""
+        payments_query = db.session.query(
+            func.coalesce(func.sum(Payment.amount_paid), 0), func.count(Payment.id)
+        ).join(Customer, Payment.customer_id == Customer.id).filter(
+            Payment.payment_status.in_(_PAYMENT_STATUSES),
+            Payment.amount_paid > 0
+        )
+        payments_total, payments_count = _filter_dates(
+            payments_query, Payment.payment_date, date_from, date_to
+        ).one()
+        
+        adjustments_query = db.session.query(
+            func.coalesce(func.sum(ProductReturn.exchange_price_difference), 0), func.count(ProductReturn.id)
+        ).join(Customer, ProductReturn.customer_id == Customer.id
+        ).join(Product, ProductReturn.product_id == Product.id).filter(
+            ProductReturn.return_type == 'exchange',
+            ProductReturn.exchange_price_difference > 0,
+            ProductReturn.refund_amount == 0
+        )
+        adjustments_total, adjustments_count = _filter_dates(
+            adjustments_query, ProductReturn.return_date, date_from, date_to
+        ).one()
+        
+        return CashFlowService.to_cents(payments_total) + CashFlowService.to_cents(adjustments_total), payments_count + adjustments_count
+    
+    @staticmethod
+    def _sum_customer_refunds(date_from=None, date_to=None):
+        """Total and count of customer refunds, aggregated in the database"""
+        refunds_query = db.session.query(
+            func.coalesce(func.sum(ProductReturn.refund_amount), 0), func.count(ProductReturn.id)
+        ).join(Customer, ProductReturn.customer_id == Customer.id
+        ).join(Product, ProductReturn.product_id == Product.id).filter(
+            ProductReturn.refund_amount > 0,
+            ProductReturn.status.in_(_REFUND_RETURN_STATUSES)
+        )
+        total, count = _filter_dates(refunds_query, ProductReturn.return_date, date_from, date_to).one()
+        
+        return CashFlowService.to_cents(total), count
+    
+    @staticmethod
+    def _sum_supplier_payments(date_from=None, date_to=None):
+        """Total and count of supplier payments, aggregated in the database"""
+        payments_query = db.session.query(
+            func.coalesce(func.sum(StockTransaction.payment_amount), 0), func.count(StockTransaction.id)
+        ).join(Supplier, StockTransaction.supplier_id == Supplier.id).filter(
+            StockTransaction.transaction_type == 'Purchase',
+            StockTransaction.payment_amount > 0
+        )
+        total, count = _filter_dates(
+            payments_query, StockTransaction.transaction_date, date_from, date_to
+        ).one()
+        
+        return CashFlowService.to_cents(total), count
     
     @staticmethod
-    def get_cashflow_summary():
-        """Get overall cash flow summary with detailed breakdown"""
+    def _sum_supplier_receipts(date_from=None, date_to=None):
+        """Total and count of supplier refunds received, aggregated in the database"""
         try:
-            # Get all cash inflows
-            customer_payments = CashFlowService.get_customer_payments()
-            supplier_receipts = CashFlowService.get_supplier_receipts()
-            
-            total_inflow = Decimal(customer_payments['total_received']) + Decimal(supplier_receipts['total_received'])
-            
-            # Get all cash outflows
-            customer_refunds = CashFlowService.get_customer_refunds()
-            supplier_payments = CashFlowService.get_supplier_payments()
+            receipts_query = db.session.query(
+                func.coalesce(func.sum(SupplierReturn.refund_amount), 0), func.count(SupplierReturn.id)
+            ).join(Supplier, SupplierReturn.supplier_id == Supplier.id).filter(
+                SupplierReturn.refund_amount > 0,
+                SupplierReturn.status == 'Completed'
+            )
+            total, count = _filter_dates(receipts_query, SupplierReturn.return_date, date_from, date_to).one()
             
-            total_outflow = Decimal(customer_refunds['total_refunded']) + Decimal(supplier_payments['total_paid'])
+            return CashFlowService.to_cents(total), count
+        except SQLAlchemyError:
+            # If supplier returns don't exist, return empty
+            db.session.rollback()
+            return 0, 0
+    
+    @staticmethod
+    def to_cents(value):
+        """Convert an amount to integer cents (minor units)"""
+        if not value:
+            return 0
+        # Numeric columns already come back as Decimal, so only wrap other types
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return int((value * 100).to_integral_value())
+    
+    @staticmethod
+    def format_cents(cents):
+        """Format integer cents as an amount with 2 decimal places"""
+        sign = "-" if cents < 0 else ""
+        cents = abs(cents)
+        return f"{sign}{cents // 100}.{cents % 100:02d}"
+    
+    @staticmethod
+    # Positional, keyword and default arguments all map to the same entry
+    @_cashflow_cached(
+        key=lambda page=None, per_page=None, date_from=None, date_to=None: hashkey(
+            'detailed', page, per_page, date_from, date_to
+        )
+    )
+    def get_detailed_cashflow(page=None, per_page=None, date_from=None, date_to=None):
+        """Get detailed cash flow with all transaction types"""
+        params = dict(page=page, per_page=per_page, date_from=date_from, date_to=date_to)
+        return {
+            "customer_payments": CashFlowService.get_customer_payments(**params),
+            "customer_refunds": CashFlowService.get_customer_refunds(**params),
+            "supplier_payments": CashFlowService.get_supplier_payments(**params),
+            "supplier_refunds": CashFlowService.get_supplier_receipts(**params)
+        }
+    
+    @staticmethod
+    @_cashflow_cached(key=lambda include_details=False: hashkey('summary', include_details))
+    def get_cashflow_summary(include_details=False):
+        """Get overall cash flow summary with detailed breakdown
+        
+        Totals are aggregated in the database and combined as integer cents; the
+        individual transactions are only built and included when include_details
+        is set.
+        """
+        return CashFlowService._build_cashflow_summary(include_details)
+    
+    @staticmethod
+    def get_precomputed_summary():
+        """JSON bytes of the latest background-computed summary, or None"""
+        return _summary_cache
+    
+    @staticmethod
+    def refresh_precomputed_summary():
+        """Recompute the summary and store it ready to be sent as a response"""
+        global _summary_cache
+        with _cashflow_cache_lock:
+            generation = _cache_generation
+        summary = orjson.dumps(CashFlowService._build_cashflow_summary())
+        with _cashflow_cache_lock:
+            # Same check as _cashflow_cached; a stale result is left to the next run
+            if generation == _cache_generation:
+                _summary_cache = summary
+    
+    @staticmethod
+    def start_summary_refresher(app, interval):
+        """Recompute the summary every interval seconds on a daemon thread"""
+        def run():
+            while True:
+                with app.app_context():
+                    try:
+                        CashFlowService.refresh_precomputed_summary()
+                    except Exception:
+                        app.logger.exception("Cash flow summary refresh failed")
+                    finally:
+                        db.session.remove()
+                time.sleep(interval)
+        
+        thread = threading.Thread(target=run, name="cashflow-summary-refresher", daemon=True)
+        thread.start()
+        return thread
+    
+    @staticmethod
+    def _build_cashflow_summary(include_details=False):
+        if include_details:
+            # Shares the cached sections with the /detailed endpoint
+            sections = CashFlowService.get_detailed_cashflow()
             
-            # Calculate net cash flow
-            net_cashflow = total_inflow - total_outflow
+            customer_payments = sections['customer_payments']
+            customer_refunds = sections['customer_refunds']
+            supplier_payments = sections['supplier_payments']
+            supplier_receipts = sections['supplier_refunds']
             
-            return {
-                "cash_inflow": {
-                    "customer_payments": CashFlowService.format_decimal(customer_payments['total_received']),
-                    "supplier_refunds": CashFlowService.format_decimal(supplier_receipts['total_received']),
-                    "total_inflow": CashFlowService.format_decimal(total_inflow)
-                },
-                "cash_outflow": {
-                    "customer_refunds": CashFlowService.format_decimal(customer_refunds['total_refunded']),
-                    "supplier_payments": CashFlowService.format_decimal(supplier_payments['total_paid']),
-                    "total_outflow": CashFlowService.format_decimal(total_outflow)
+            payments_received = (CashFlowService.to_cents(customer_payments['total_received']), customer_payments['count'])
+            refunds_given = (CashFlowService.to_cents(customer_refunds['total_refunded']), customer_refunds['count'])
+            payments_made = (CashFlowService.to_cents(supplier_payments['total_paid']), supplier_payments['count'])
+            refunds_received = (CashFlowService.to_cents(supplier_receipts['total_received']), supplier_receipts['count'])
+        else:
+            payments_received = CashFlowService._sum_customer_payments()
+            refunds_given = CashFlowService._sum_customer_refunds()
+            payments_made = CashFlowService._sum_supplier_payments()
+            refunds_received = CashFlowService._sum_supplier_receipts()
+        
+        # Cash inflows and outflows
+        total_inflow = payments_received[0] + refunds_received[0]
+        total_outflow = refunds_given[0] + payments_made[0]
+        
+        # Calculate net cash flow
+        net_cashflow = total_inflow - total_outflow
+        
+        detailed_breakdown = {
+            "customer_transactions": {
+                "payments_received": {
+                    "amount": CashFlowService.format_cents(payments_received[0]),
+                    "count": payments_received[1]
                 },
-                "net_cashflow": CashFlowService.format_decimal(net_cashflow),
-                "detailed_breakdown": {
-                    "customer_transactions": {
-                        "payments_received": {
-                            "amount": CashFlowService.format_decimal(customer_payments['total_received']),
-                            "count": customer_payments['count'],
-                            "transactions": customer_payments['customer_payments']
-                        },
-                        "refunds_given": {
-                            "amount": CashFlowService.format_decimal(customer_refunds['total_refunded']),
-                            "count": customer_refunds['count'],
-                            "transactions": customer_refunds['customer_refunds']
-                        }
-                    },
-                    "supplier_transactions": {
-                        "payments_made": {
-                            "amount": CashFlowService.format_decimal(supplier_payments['total_paid']),
-                            "count": supplier_payments['count'],
-                            "transactions": supplier_payments['supplier_payments']
-                        },
-                        "refunds_received": {
-                            "amount": CashFlowService.format_decimal(supplier_receipts['total_received']),
-                            "count": supplier_receipts['count'],
-                            "transactions": supplier_receipts['supplier_receipts']
-                        }
-                    }
+                "refunds_given": {
+                    "amount": CashFlowService.format_cents(refunds_given[0]),
+                    "count": refunds_given[1]
+                }
+            },
+            "supplier_transactions": {
+                "payments_made": {
+                    "amount": CashFlowService.format_cents(payments_made[0]),
+                    "count": payments_made[1]
                 },
-                "summary": {
-                    "total_customer_transactions": customer_payments['count'] + customer_refunds['count'],
-                    "total_supplier_transactions": supplier_payments['count'] + supplier_receipts['count'],
-                    "cash_position": "Positive" if net_cashflow > 0 else "Negative" if net_cashflow < 0 else "Neutral"
+                "refunds_received": {
+                    "amount": CashFlowService.format_cents(refunds_received[0]),
+                    "count": refunds_received[1]
                 }
             }
-        except Exception as e:
-            raise Exception(f"Error generating cash flow summary: {str(e)}")
\ No newline at end of file
+        }
+        
+        if include_details:
+            customer_breakdown = detailed_breakdown["customer_transactions"]
+            supplier_breakdown = detailed_breakdown["supplier_transactions"]
+            customer_breakdown["payments_received"]["transactions"] = customer_payments['customer_payments']
+            customer_breakdown["refunds_given"]["transactions"] = customer_refunds['customer_refunds']
+            supplier_breakdown["payments_made"]["transactions"] = supplier_payments['supplier_payments']
+            supplier_breakdown["refunds_received"]["transactions"] = supplier_receipts['supplier_receipts']
+        
+        return {
+            "cash_inflow": {
+                "customer_payments": CashFlowService.format_cents(payments_received[0]),
+                "supplier_refunds": CashFlowService.format_cents(refunds_received[0]),
+                "total_inflow": CashFlowService.format_cents(total_inflow)
+            },
+            "cash_outflow": {
+                "customer_refunds": CashFlowService.format_cents(refunds_given[0]),
+                "supplier_payments": CashFlowService.format_cents(payments_made[0]),
+                "total_outflow": CashFlowService.format_cents(total_outflow)
+            },
+            "net_cashflow": CashFlowService.format_cents(net_cashflow),
+            "detailed_breakdown": detailed_breakdown,
+            "summary": {
+                "total_customer_transactions": payments_received[1] + refunds_given[1],
+                "total_supplier_transactions": payments_made[1] + refunds_received[1],
+                "cash_position": "Positive" if net_cashflow > 0 else "Negative" if net_cashflow < 0 else "Neutral"
+            }
+        }
\ No newline at end of file
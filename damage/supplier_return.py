@@ -28,6 +28,11 @@ class SupplierReturn(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    # Matches the cash flow filter on status/refund ordered by return date
+    __table_args__ = (
+        db.Index("ix_supplierreturn_status_refund_date", status, refund_amount, return_date.desc()),
+    )
+
     # Relationships
     damaged_product = relationship("DamagedProduct")
     supplier = relationship("Supplier")
@@ -26,6 +26,11 @@ class Payment(db.Model):
     payment_status = db.Column(db.String(50), default="Successful")  # Successful / Failed / Pending
     notes = db.Column(db.Text, nullable=True)
 
+    # Matches the cash flow filter on status/amount ordered by payment date
+    __table_args__ = (
+        db.Index("ix_payment_status_paid_date", payment_status, amount_paid, payment_date.desc()),
+    )
+
     invoice = db.relationship("Invoice", back_populates="payments")
     
     def calculate_amounts(self):
@@ -100,6 +100,7 @@ class PurchaseService:
             "created_at": datetime.now().isoformat()
         }
         main_transaction.notes = json.dumps(payment_info)
+        main_transaction.set_payment_info(payment_info)
 
         # Get supplier details
         from suppliers.supplier import Supplier
@@ -266,11 +267,13 @@ class PurchaseService:
 
         # Get existing payment amount from the same stored info
         existing_paid_amt = Decimal("0")
+        existing_products = None
         if transaction.notes:
             try:
                 import json
                 existing_payment = json.loads(transaction.notes)
                 existing_paid_amt = Decimal(existing_payment.get("payment_amount", "0"))
+                existing_products = existing_payment.get("products")
             except json.JSONDecodeError:
                 pass
 
@@ -305,9 +308,13 @@ class PurchaseService:
             "total_amount": str(total_amt),
             "updated_at": datetime.now().isoformat()
         }
+        # Keep the purchased product details recorded when the purchase was created
+        if existing_products:
+            payment_info["products"] = existing_products
 
         import json
         transaction.notes = json.dumps(payment_info)
+        transaction.set_payment_info(payment_info)
         db.session.commit()
 
         balance_due = max(Decimal('0'), balance_amt)  # Prevent negative balance
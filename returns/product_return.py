@@ -48,6 +48,11 @@ class ProductReturn(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    # Matches the cash flow filter on type/refund ordered by return date
+    __table_args__ = (
+        db.Index("ix_return_type_refund_date", return_type, refund_amount, return_date.desc()),
+    )
+
     # Relationships
     customer = relationship("Customer")
     product = relationship("Product", foreign_keys=[product_id])
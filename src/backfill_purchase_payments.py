@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from decimal import InvalidOperation
+from sqlalchemy import text
+from src.extensions import db
+from stock_transactions.stock_transaction import StockTransaction
+
+# Columns added to stock_transactions for purchase payment details
+SCHEMA_UPDATES = [
+    "ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS payment_amount NUMERIC(14, 2)",
+    "ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS payment_method VARCHAR(50)",
+    "ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS payment_status VARCHAR(50)",
+    "ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS tx_reference VARCHAR(255)",
+    "ALTER TABLE stock_transactions ADD COLUMN IF NOT EXISTS products JSONB",
+    "CREATE INDEX IF NOT EXISTS ix_stocktx_type_payment ON stock_transactions (transaction_type, payment_amount)",
+]
+
+def backfill_purchase_payments():
+    for statement in SCHEMA_UPDATES:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+    purchases = StockTransaction.query.filter(
+        StockTransaction.transaction_type == "Purchase",
+        StockTransaction.notes.isnot(None)
+    ).all()
+
+    updated = 0
+    for purchase in purchases:
+        try:
+            payment_info = json.loads(purchase.notes)
+            purchase.set_payment_info(payment_info)
+            updated += 1
+        except (json.JSONDecodeError, AttributeError, InvalidOperation):
+            # Plain text notes without payment details
+            continue
+
+    db.session.commit()
+    print(f"Backfilled payment details for {updated} of {len(purchases)} purchase transactions")
+
+if __name__ == "__main__":
+    from main import create_app
+    app = create_app()
+    with app.app_context():
+        backfill_purchase_payments()
@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from src.extensions import db
+
+# Indexes backing the cashflow queries; db.create_all() does not add them to existing tables
+CASHFLOW_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_payment_status_paid_date ON payments (payment_status, amount_paid, payment_date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_return_type_refund_date ON product_returns (return_type, refund_amount, return_date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_supplierreturn_status_refund_date ON supplier_returns (status, refund_amount, return_date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_stocktx_type_date ON stock_transactions (transaction_type, transaction_date DESC)",
+]
+
+def create_cashflow_indexes():
+    for statement in CASHFLOW_INDEXES:
+        db.session.execute(text(statement))
+    db.session.commit()
+    print(f"Ensured {len(CASHFLOW_INDEXES)} cashflow indexes")
+
+if __name__ == "__main__":
+    from main import create_app
+    app = create_app()
+    with app.app_context():
+        create_cashflow_indexes()
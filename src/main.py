@@ -2,8 +2,18 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+
+import orjson
 from flask import Flask, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import http_date
 from src.config import Config
 from src.extensions import db, migrate, mail
 from user.user import User, Permission, UserPermission, AuditLog
@@ -12,8 +22,42 @@ from settings.company_settings import Settings
 # register blueprints dynamically
 from routes import register_routes
 
+def _orjson_default(o):
+    """Serialize the types Flask's default provider supports but orjson does not"""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson - responses are encoded straight to bytes"""
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_orjson_default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     app.config.from_object(Config)
     app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
     app.config['SESSION_TYPE'] = 'filesystem'
@@ -48,6 +92,21 @@ def create_app():
     # register routes/blueprints
     register_routes(app)
 
+    @app.errorhandler(SQLAlchemyError)
+    def handle_database_error(e):
+        db.session.rollback()
+        # Details (including SQL) go to the log only, never to the client
+        app.logger.exception("Database error: %s", e)
+        return jsonify({"error": "A database error occurred"}), 500
+
+    @app.errorhandler(Exception)
+    def handle_unexpected_error(e):
+        # Let HTTP errors (404, 405, ...) keep their own responses
+        if isinstance(e, HTTPException):
+            return e
+        app.logger.exception("Unhandled error: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
     @app.get("/")
     def index():
         return jsonify({"message": "Store Management API"}), 200
@@ -83,4 +142,12 @@ if __name__ == "__main__":
     smtplib.SMTP.debuglevel = 0
     
     app = create_app()
+
+    # Keep a precomputed cash flow summary fresh while serving; with the debug
+    # reloader only the serving child process runs the refresher
+    interval = app.config.get("CASHFLOW_SUMMARY_REFRESH_SECONDS")
+    if interval and (not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        from cashflow.cashflow_service import CashFlowService
+        CashFlowService.start_summary_refresher(app, interval)
+
     app.run(host="0.0.0.0", port=5000, debug=app.config["DEBUG"])
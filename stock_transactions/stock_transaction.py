@@ -1,5 +1,7 @@
 from datetime import datetime
+from decimal import Decimal
 from src.extensions import db
+from sqlalchemy.dialects.postgresql import JSONB
 import uuid
 
 class StockTransaction(db.Model):
@@ -18,4 +20,25 @@ class StockTransaction(db.Model):
     reference_number = db.Column(db.String(255), nullable=True)
     notes = db.Column(db.Text, nullable=True)
 
+    # Purchase payment details (also kept in notes for older readers)
+    payment_amount = db.Column(db.Numeric(14, 2), nullable=True)
+    payment_method = db.Column(db.String(50), nullable=True)
+    payment_status = db.Column(db.String(50), nullable=True)  # Paid / Partially Paid / Pending
+    tx_reference = db.Column(db.String(255), nullable=True)
+    products = db.Column(JSONB, nullable=True)
+
+    # Matches lookups by transaction type ordered by date
+    __table_args__ = (
+        db.Index("ix_stocktx_type_date", transaction_type, transaction_date.desc()),
+        db.Index("ix_stocktx_type_payment", transaction_type, payment_amount),
+    )
+
     product = db.relationship("Product", overlaps="product_ref,stock_transactions")
+
+    def set_payment_info(self, payment_info):
+        """Copy purchase payment details from a notes payment_info dict into columns"""
+        self.payment_amount = Decimal(str(payment_info.get("payment_amount") or 0))
+        self.payment_method = payment_info.get("payment_method")
+        self.payment_status = payment_info.get("payment_status")
+        self.tx_reference = payment_info.get("transaction_reference")
+        self.products = payment_info.get("products")